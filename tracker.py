@@ -13,11 +13,55 @@
 
 import argparse
 import csv
+import functools
 import json
+import operator
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from array import array
+from collections import defaultdict
+from itertools import compress, islice, repeat
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
+
+# Сторонний модуль regex (если установлен) умеет отпускать GIL во время
+# поиска (concurrent=True). Используется только с --threads: в одном потоке
+# и в пуле процессов стандартный re быстрее.
+try:
+    import regex as _regex
+except ImportError:
+    _regex = None
+
+# =========================
+#  Регулярные выражения
+# =========================
+
+# Компилируем один раз при импорте, а не на каждую раздачу.
+# Все шаблоны в нижнем регистре: ищем по raw_hand.lower() без re.IGNORECASE.
+# Дата, лимит и ID раздачи ищутся одной регуляркой за один проход.
+_SCAN_PATTERN = (
+    r"(?P<date>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"
+    r"|(?P<limit>(?:nl|pl)\s?(?P<bb>\d+))"
+    r"|hand\s*#(?P<hid>\d+)"
+)
+_SCAN_RE = re.compile(_SCAN_PATTERN)
+# Разделитель раздач для медленного пути split_raw_hands
+_SPLIT_RE = re.compile(r"\n\s*\n")
+# Строка из одних пробельных символов (не пустая) — её str.split не увидит
+_WS_LINE_RE = re.compile(r"\n[^\S\n]+\n")
+# Хвост строки героя: "... won 1.25" / "... lost 0.50"
+_HERO_TAIL_PATTERN = r"(won|lost)\s([+-]?\d+(?:\.\d+)?)"
+_HERO_TAIL_RE = re.compile(_HERO_TAIL_PATTERN)
+
+
+@functools.lru_cache(maxsize=None)
+def _gil_free_patterns():
+    """Те же шаблоны, скомпилированные модулем regex (только для --threads)"""
+    return _regex.compile(_SCAN_PATTERN), _regex.compile(_HERO_TAIL_PATTERN)
+
 
 # =========================
 #       CLI аргументы
@@ -52,6 +96,16 @@ def parse_args():
         "--encoding", default="utf-8",
         help="Кодировка входных файлов (по умолчанию utf-8, можно cp1251)"
     )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Число параллельных воркеров для парсинга файлов "
+             "(по умолчанию — число ядер, 1 — без параллелизма)"
+    )
+    parser.add_argument(
+        "--threads", action="store_true",
+        help="Парсить файлы потоками вместо процессов (нужен модуль regex, "
+             "который отпускает GIL во время поиска)"
+    )
     parser.add_argument(
         "--export-csv",
         help="Экспорт сессий в CSV файл"
@@ -60,6 +114,14 @@ def parse_args():
         "--export-json",
         help="Экспорт всех данных в JSON"
     )
+    parser.add_argument(
+        "--export-hands", action="store_true",
+        help="Добавить в JSON список раздач каждой сессии (увеличивает размер файла)"
+    )
+    parser.add_argument(
+        "--pretty", action="store_true",
+        help="Форматировать JSON с отступами (по умолчанию — компактно)"
+    )
     parser.add_argument(
         "--report", nargs="*", default=["summary", "sessions"],
         help="Какие отчёты выводить: summary sessions limits"
@@ -95,142 +157,351 @@ def split_raw_hands(text: str):
     """
     Делит содержимое файла на отдельные раздачи.
     Предполагаем, что между раздачами одна или более пустых строк.
+    Обычно раздачи разделены ровно "\n\n" — тогда хватает str.split.
+    Если в файле есть хотя бы одна строка из одних пробелов/табов,
+    такой разделитель str.split пропустит и склеит две раздачи,
+    поэтому в этом случае делим регуляркой.
     """
-    blocks = re.split(r"\n\s*\n", text.strip())
+    text = text.strip()
+    if not _WS_LINE_RE.search(text):
+        blocks = text.split("\n\n")
+    else:
+        blocks = _SPLIT_RE.split(text)
     return [b.strip() for b in blocks if b.strip()]
 
 
+@functools.lru_cache(maxsize=100_000)
+def _parse_dt(s: str):
+    """
+    Разбор даты раздачи с кэшем: в истории много одинаковых меток времени.
+    Размер кэша ограничен, чтобы не расти бесконечно на уникальных датах.
+    Формат "YYYY-MM-DD HH:MM:SS" fromisoformat понимает напрямую (Python 3.7+),
+    и это заметно быстрее strptime.
+    """
+    return datetime.fromisoformat(s)
+
+
+@functools.lru_cache(maxsize=None)
+def make_hand_parser(hero_name: str, gil_free: bool = False):
+    """
+    Собирает парсер раздачи, специализированный под конкретного героя:
+    ник в нижнем регистре, его длина и методы регулярок привязываются
+    один раз, а не ищутся заново на каждой раздаче.
+    gil_free — искать модулем regex с concurrent=True (для пула потоков).
+    Возвращает функцию parse(raw_hand) -> dict (см. parse_hand).
+    """
+    hero_key = hero_name.lower()
+    hero_len = len(hero_key)
+    parse_dt = _parse_dt
+    if gil_free:
+        scan_re, tail_re = _gil_free_patterns()
+        scan = functools.partial(scan_re.finditer, concurrent=True)
+        tail_search = functools.partial(tail_re.search, concurrent=True)
+    else:
+        scan = _SCAN_RE.finditer
+        tail_search = _HERO_TAIL_RE.search
+
+    def parse(raw_hand: str):
+        # Одна копия в нижнем регистре для всех поисков
+        low = raw_hand.lower()
+
+        # Один проход по тексту: берём первое вхождение даты, лимита и ID
+        date_str = limit_str = bb_str = hid_str = None
+        for m in scan(low):
+            kind = m.lastgroup
+            if kind == "date":
+                if date_str is None:
+                    date_str = m.group("date")
+            elif kind == "limit":
+                if limit_str is None:
+                    limit_str, bb_str = m.group("limit"), m.group("bb")
+            elif hid_str is None:
+                hid_str = m.group("hid")
+            if date_str is not None and limit_str is not None and hid_str is not None:
+                break
+
+        # --------------------------
+        # 1. Дата/время раздачи
+        # --------------------------
+        # Попытка найти дату формата: YYYY-MM-DD HH:MM:SS
+        if date_str:
+            hand_time = parse_dt(date_str)
+        else:
+            # fallback — если не нашли дату
+            hand_time = None
+
+        # --------------------------
+        # 2. Лимит (пример: NL25, NL50)
+        # --------------------------
+        limit = limit_str.upper() if limit_str else "unknown"
+
+        # --------------------------
+        # 3. Бай-ин BB (например, в NL25 big blind = 0.25)
+        # --------------------------
+        bb_size = None
+        if bb_str:
+            try:
+                bb_size = float(bb_str) / 100
+            except Exception:
+                bb_size = None
+
+        # --------------------------
+        # 4. Результат героя в деньгах
+        # --------------------------
+        # Пример упрощённого поиска:
+        # MyHero won 1.25
+        result_money = 0.0
+        hero_match = None
+        # Прыгаем по вхождениям ника через str.find (без разбиения раздачи
+        # на строки) и ищем хвост won/lost только до конца этой строки
+        pos = low.find(hero_key)
+        while pos >= 0:
+            line_end = low.find("\n", pos)
+            if line_end < 0:
+                line_end = len(low)
+            hero_match = tail_search(low, pos + hero_len, line_end)
+            if hero_match:
+                break
+            # со следующей строки: при пустом нике find("", line_end) вернул
+            # бы тот же line_end, и цикл бы не продвигался
+            pos = low.find(hero_key, line_end + 1)
+
+        if hero_match:
+            sign = 1 if hero_match.group(1) == "won" else -1
+            result_money = sign * float(hero_match.group(2))
+
+        # --------------------------
+        # 5. Результат в BB
+        # --------------------------
+        result_bb = None
+        if bb_size and bb_size > 0:
+            result_bb = result_money / bb_size
+
+        # --------------------------
+        # 6. ID раздачи (если есть)
+        # --------------------------
+        # Без "Hand #" ID остаётся None — уникальный запасной ID
+        # ("файл:номер блока") проставляет parse_hands
+        hand_id = hid_str
+
+        return {
+            "hand_id": hand_id,
+            "datetime": hand_time,
+            "limit": limit,
+            "bb_size": bb_size,
+            "hero_result_money": result_money,
+            "hero_result_bb": result_bb
+        }
+
+    return parse
+
+
 def parse_hand(raw_hand: str, hero_name: str):
     """
     Возвращает словарь со структурой раздачи.
+    Если в тексте нет "Hand #", hand_id будет None: уникальный запасной ID
+    ("файл:номер блока") выдаёт parse_hands по имени источника.
     """
+    return make_hand_parser(hero_name)(raw_hand)
 
-    # --------------------------
-    # 1. Дата/время раздачи
-    # --------------------------
-    # Попытка найти дату формата: YYYY-MM-DD HH:MM:SS
-    date_match = re.search(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})", raw_hand)
-    if date_match:
-        hand_time = datetime.strptime(date_match.group(1), "%Y-%m-%d %H:%M:%S")
-    else:
-        # fallback — если не нашли дату
-        hand_time = None
-
-    # --------------------------
-    # 2. Лимит (пример: NL25, NL50)
-    # --------------------------
-    limit_match = re.search(r"(NL|PL)\s?(\d+)", raw_hand, re.IGNORECASE)
-    limit = limit_match.group(0).upper() if limit_match else "unknown"
-
-    # --------------------------
-    # 3. Бай-ин BB (например, в NL25 big blind = 0.25)
-    # --------------------------
-    bb_size = None
-    if limit_match:
+
+def parse_hands(raw_hands, hero_name: str, source: Optional[str] = None,
+                gil_free: bool = False):
+    """
+    Парсит пачку раздач за один вызов.
+    Всё, что не зависит от конкретной раздачи, вычисляется один раз на пачку.
+    Раздачи, которые не удалось разобрать, пропускаются с сообщением в stderr.
+    source — имя источника (файла): раздачам без ID выдаётся "source:номер".
+    """
+    parse = make_hand_parser(hero_name, gil_free)
+    hands = []
+    append = hands.append
+    for idx, raw in enumerate(raw_hands, start=1):
         try:
-            bb_size = float(limit_match.group(2)) / 100
-        except Exception:
-            bb_size = None
-
-    # --------------------------
-    # 4. Результат героя в деньгах
-    # --------------------------
-    # Пример упрощённого поиска:
-    # MyHero won 1.25
-    result_money = 0.0
-    hero_pattern = re.compile(rf"{re.escape(hero_name)}.*?(won|lost)\s([+-]?\d+(\.\d+)?)", re.IGNORECASE)
-    hero_match = hero_pattern.search(raw_hand)
-
-    if hero_match:
-        sign = 1 if hero_match.group(1).lower() == "won" else -1
-        result_money = sign * float(hero_match.group(2))
-
-    # --------------------------
-    # 5. Результат в BB
-    # --------------------------
-    result_bb = None
-    if bb_size and bb_size > 0:
-        result_bb = result_money / bb_size
-
-    # --------------------------
-    # 6. ID раздачи (если есть)
-    # --------------------------
-    hand_id_match = re.search(r"Hand\s*#(\d+)", raw_hand, re.IGNORECASE)
-    hand_id = hand_id_match.group(1) if hand_id_match else id(raw_hand)
+            h = parse(raw)
+        except Exception as e:
+            print(f"Ошибка парсинга раздачи: {e}", file=sys.stderr)
+            continue
+        if h["hand_id"] is None and source is not None:
+            h["hand_id"] = f"{source}:{idx}"
+        append(h)
+    return hands
 
-    return {
-        "hand_id": hand_id,
-        "datetime": hand_time,
-        "limit": limit,
-        "bb_size": bb_size,
-        "hero_result_money": result_money,
-        "hero_result_bb": result_bb,
-        "raw": raw_hand
-    }
+
+def _parse_file(file: Path, hero_name: str, encoding: str, gil_free: bool = False):
+    """
+    Читает и парсит один файл. Вызывается в том числе в дочерних процессах.
+    Возвращает (число найденных блоков раздач, список распарсенных раздач).
+    """
+    try:
+        text = file.read_text(encoding=encoding)
+    except Exception as e:
+        print(f"Ошибка чтения файла {file}: {e}", file=sys.stderr)
+        return 0, []
+
+    blocks = split_raw_hands(text)
+    return len(blocks), parse_hands(blocks, hero_name, str(file), gil_free)
+
+
+def iter_parsed_hands(files, hero_name: str, encoding: str, workers: int = 1,
+                      stats=None, threads: bool = False):
+    """
+    Потоково читает файлы и отдаёт распарсенные раздачи.
+    При workers > 1 файлы парсятся параллельно в пуле процессов (re не
+    отпускает GIL). С threads=True и установленным модулем regex — в пуле
+    потоков, поиск тогда идёт через regex с concurrent=True.
+    Порядок раздач совпадает с порядком файлов.
+    Если передан словарь stats, в stats["raw_hands"] копится число найденных
+    блоков раздач (включая те, что не удалось распарсить).
+    """
+    if stats is not None:
+        stats.setdefault("raw_hands", 0)
+
+    # Пул нужен только если есть что распараллелить: больше одного файла
+    files = list(files)
+    if workers <= 1 or len(files) <= 1:
+        for file in files:
+            blocks_count, hands = _parse_file(file, hero_name, encoding)
+            if stats is not None:
+                stats["raw_hands"] += blocks_count
+            yield from hands
+        return
+
+    # Одна задача — один файл, поэтому воркеров больше, чем файлов, не нужно
+    gil_free = threads and _regex is not None
+    executor_cls = ThreadPoolExecutor if gil_free else ProcessPoolExecutor
+    with executor_cls(max_workers=min(workers, len(files))) as ex:
+        results = ex.map(
+            _parse_file, files, repeat(hero_name), repeat(encoding), repeat(gil_free)
+        )
+        for blocks_count, hands in results:
+            if stats is not None:
+                stats["raw_hands"] += blocks_count
+            yield from hands
 
 
 # =========================
 #   Формирование сессий
 # =========================
 
-def build_sessions(hands, session_gap_minutes: int):
+def _to_seconds(t: datetime) -> int:
+    """Время раздачи в целых секундах (без timezone, только для разностей)"""
+    return t.toordinal() * 86400 + t.hour * 3600 + t.minute * 60 + t.second
+
+
+def build_hand_columns(hands):
     """
-    Формирует сессии на основе времени раздач.
+    Раскладывает раздачи по колонкам (struct-of-arrays), отсортированным по времени.
+    Раздачи без времени отбрасываются.
+    Колонки: hands, times, ts (секунды, array 'q'), money (array 'd'),
+    bb (array 'd', 0.0 если лимит неизвестен), has_bb (флаги 0/1),
+    limit_code (array 'I', индекс в limits_vocab).
+    Итоги по отброшенным раздачам лежат в "undated" — они нужны для summary.
     """
-    # Убираем раздачи без времени
-    hands = [h for h in hands if h["datetime"] is not None]
+    # Отделяем раздачи без времени, попутно считая их итоги
+    dated = []
+    undated = {"hands_count": 0, "money": 0.0, "bb": 0.0, "has_bb": False}
+    for h in hands:
+        if h["datetime"] is not None:
+            dated.append(h)
+            continue
+        undated["hands_count"] += 1
+        undated["money"] += h["hero_result_money"]
+        if h["hero_result_bb"] is not None:
+            undated["bb"] += h["hero_result_bb"]
+            undated["has_bb"] = True
 
     # Сортируем по времени
-    hands.sort(key=lambda x: x["datetime"])
-
-    sessions = []
-    current = []
+    dated.sort(key=operator.itemgetter("datetime"))
+    hands = dated
 
-    gap = timedelta(minutes=session_gap_minutes)
+    # Кодируем лимиты маленькими целыми: дальше работаем с int, а строки
+    # достаём из словаря только при формировании сессий
+    vocab = {}
+    limit_code = array("I", [vocab.setdefault(h["limit"], len(vocab)) for h in hands])
 
-    prev_time = None
+    # Числовые колонки наполняются сразу из map(itemgetter(...)), без
+    # промежуточного списка на каждую колонку; array растёт геометрически,
+    # так что отдельная предаллокация по оценке размера не нужна
+    times = list(map(operator.itemgetter("datetime"), hands))
+    bb_raw = list(map(operator.itemgetter("hero_result_bb"), hands))
 
-    for hand in hands:
-        if prev_time is None:
-            # начинаем первую сессию
-            current = [hand]
-        else:
-            if hand["datetime"] - prev_time > gap:
-                # разрыв — завершаем текущую сессию
-                sessions.append(current)
-                current = [hand]
-            else:
-                current.append(hand)
+    return {
+        "hands": hands,
+        "times": times,
+        "ts": array("q", map(_to_seconds, times)),
+        "money": array("d", map(operator.itemgetter("hero_result_money"), hands)),
+        "bb": array("d", [x or 0.0 for x in bb_raw]),
+        "has_bb": bytearray(map(operator.is_not, bb_raw, repeat(None))),
+        "limit_code": limit_code,
+        "limits_vocab": list(vocab),
+        "undated": undated,
+    }
 
-        prev_time = hand["datetime"]
 
-    if current:
-        sessions.append(current)
+def _aggregate_sessions(cols, session_gap_minutes: int, keep_hands: bool = False):
+    """
+    Один проход по колонкам: режет раздачи на сессии и заодно копит
+    общие итоги для summary, чтобы не перечитывать раздачи повторно.
+    keep_hands — класть ли в сессию список её раздач (ключ "hands").
+    Возвращает (sessions, totals).
+    """
+    times = cols["times"]
+    ts = cols["ts"]
+    money = cols["money"]
+    bb = cols["bb"]
+    has_bb = cols["has_bb"]
+    limit_code = cols["limit_code"]
+    limits_vocab = cols["limits_vocab"]
+    hands = cols["hands"]
+    undated = cols["undated"]
+
+    gap_s = session_gap_minutes * 60
+    n = len(ts)
+
+    # Индексы начала сессий: новая сессия там, где разрыв больше gap.
+    # Аналог np.flatnonzero(np.diff(ts) > gap) + 1 на встроенных функциях,
+    # без Python-цикла и без арифметики datetime/timedelta на каждую раздачу.
+    starts = []
+    if n:
+        diffs = map(operator.sub, islice(ts, 1, None), ts)
+        starts = [0]
+        starts.extend(compress(range(1, n), map(gap_s.__lt__, diffs)))
+    bounds = zip(starts, starts[1:] + [n])
+
+    # Общие итоги (неокруглённые), начиная с раздач без времени
+    money_all = undated["money"]
+    bb_all = undated["bb"]
+    has_bb_all = undated["has_bb"]
 
     # Конвертируем сессии в структурированный формат
     result = []
-    for idx, sess in enumerate(sessions, start=1):
-        start_time = sess[0]["datetime"]
-        end_time = sess[-1]["datetime"]
-        duration = (end_time - start_time).total_seconds() / 60
-        hands_count = len(sess)
+    for idx, (a, b) in enumerate(bounds, start=1):
+        start_time = times[a]
+        end_time = times[b - 1]
+        # длительность — по целым секундам, без timedelta
+        duration = (ts[b - 1] - ts[a]) / 60
+        hands_count = b - a
 
         # лимиты
-        limits = list({h["limit"] for h in sess})
-        limit = limits[0] if len(limits) == 1 else "mixed"
+        codes = set(limit_code[a:b])
+        limit = limits_vocab[codes.pop()] if len(codes) == 1 else "mixed"
 
         # totals
-        money_total = sum(h["hero_result_money"] for h in sess)
+        money_total = sum(money[a:b])
+        money_all += money_total
 
-        bb_results = [h["hero_result_bb"] for h in sess if h["hero_result_bb"] is not None]
-        bb_total = sum(bb_results) if bb_results else None
+        # пропуски в bb хранятся как 0.0, поэтому сумма — по срезу целиком
+        bb_total = sum(bb[a:b]) if any(has_bb[a:b]) else None
 
         if bb_total is not None:
+            bb_all += bb_total
+            has_bb_all = True
             bb_per_100 = (bb_total / hands_count) * 100
         else:
             bb_per_100 = None
 
-        result.append({
+        session = {
             "session_id": idx,
             "start_time": start_time,
             "end_time": end_time,
@@ -240,10 +511,43 @@ def build_sessions(hands, session_gap_minutes: int):
             "total_result_money": round(money_total, 2),
             "total_result_bb": round(bb_total, 2) if bb_total is not None else None,
             "bb_per_100": round(bb_per_100, 2) if bb_per_100 is not None else None,
-            "hands": sess
-        })
+        }
+        if keep_hands:
+            session["hands"] = hands[a:b]
+        result.append(session)
+
+    totals = {
+        "total_hands": n + undated["hands_count"],
+        "money": money_all,
+        "bb": bb_all if has_bb_all else None,
+        "first_hand_time": times[0] if n else None,
+        "last_hand_time": times[-1] if n else None,
+    }
+    return result, totals
 
-    return result
+
+def build_sessions(hands, session_gap_minutes: int, keep_hands: bool = False):
+    """
+    Формирует сессии на основе времени раздач.
+    """
+    sessions, _ = _aggregate_sessions(
+        build_hand_columns(hands), session_gap_minutes, keep_hands
+    )
+    return sessions
+
+
+def build_all(hands, session_gap_minutes: int, keep_hands: bool = False):
+    """
+    Строит сессии, статистику лимитов и сводку за один проход по раздачам.
+    Лимиты и сводка считаются из уже готовых сессий и итогов.
+    Возвращает (sessions, limits, summary).
+    """
+    sessions, totals = _aggregate_sessions(
+        build_hand_columns(hands), session_gap_minutes, keep_hands
+    )
+    limits = build_limits_stats(sessions)
+    summary = build_summary(totals, sessions)
+    return sessions, limits, summary
 
 
 # =========================
@@ -252,38 +556,37 @@ def build_sessions(hands, session_gap_minutes: int):
 
 def build_limits_stats(sessions):
     """Группирует статистику по лимитам"""
-    stats = {}
+    # Слоты: [sessions_count, hands_count, total_result_money, total_result_bb]
+    stats = defaultdict(lambda: [0, 0, 0.0, 0.0])
 
     for sess in sessions:
         limit = sess["limit"]
         if limit == "mixed":
             continue  # не учитываем смешанные
 
-        if limit not in stats:
-            stats[limit] = {
-                "limit": limit,
-                "sessions_count": 0,
-                "hands_count": 0,
-                "total_result_money": 0.0,
-                "total_result_bb": 0.0,
-            }
-
-        stats[limit]["sessions_count"] += 1
-        stats[limit]["hands_count"] += sess["hands_count"]
-        stats[limit]["total_result_money"] += sess["total_result_money"]
+        st = stats[limit]
+        st[0] += 1
+        st[1] += sess["hands_count"]
+        st[2] += sess["total_result_money"]
         if sess["total_result_bb"] is not None:
-            stats[limit]["total_result_bb"] += sess["total_result_bb"]
+            st[3] += sess["total_result_bb"]
 
-    # bb/100
+    # bb/100 и итоговые словари
     results = []
-    for limit, d in stats.items():
-        if d["hands_count"] > 0:
-            bb100 = (d["total_result_bb"] / d["hands_count"]) * 100 if d["total_result_bb"] else None
+    for limit, (sessions_count, hands_count, money, bb) in stats.items():
+        if hands_count > 0:
+            bb100 = (bb / hands_count) * 100 if bb else None
         else:
             bb100 = None
 
-        d["bb_per_100"] = round(bb100, 2) if bb100 is not None else None
-        results.append(d)
+        results.append({
+            "limit": limit,
+            "sessions_count": sessions_count,
+            "hands_count": hands_count,
+            "total_result_money": money,
+            "total_result_bb": bb,
+            "bb_per_100": round(bb100, 2) if bb100 is not None else None,
+        })
 
     return results
 
@@ -292,8 +595,10 @@ def build_limits_stats(sessions):
 #     SUMMARY отчёт
 # =========================
 
-def build_summary(hands, sessions):
-    if not hands:
+def build_summary(totals, sessions):
+    """Сводка по итогам из _aggregate_sessions"""
+    total_hands = totals["total_hands"]
+    if not total_hands:
         return {
             "total_hands": 0,
             "total_sessions": 0,
@@ -304,29 +609,24 @@ def build_summary(hands, sessions):
             "last_hand_time": None
         }
 
-    total_hands = len(hands)
     total_sessions = len(sessions)
 
-    money_total = sum(h["hero_result_money"] for h in hands)
-
-    bb_list = [h["hero_result_bb"] for h in hands if h["hero_result_bb"] is not None]
-    bb_total = sum(bb_list) if bb_list else None
+    money_total = totals["money"]
+    bb_total = totals["bb"]
 
     if bb_total is not None:
         bb_per_100 = (bb_total / total_hands) * 100
     else:
         bb_per_100 = None
 
-    times = [h["datetime"] for h in hands if h["datetime"] is not None]
-
     return {
         "total_hands": total_hands,
         "total_sessions": total_sessions,
         "total_result_money": round(money_total, 2),
         "total_result_bb": round(bb_total, 2) if bb_total is not None else None,
         "overall_bb_per_100": round(bb_per_100, 2) if bb_per_100 is not None else None,
-        "first_hand_time": min(times) if times else None,
-        "last_hand_time": max(times) if times else None
+        "first_hand_time": totals["first_hand_time"],
+        "last_hand_time": totals["last_hand_time"]
     }
 
 
@@ -379,37 +679,37 @@ def print_limits_report(limits):
 #        EXPORT
 # =========================
 
+_CSV_COLUMNS = (
+    "session_id", "start_time", "end_time", "duration_minutes",
+    "hands_count", "limit", "total_result_money",
+    "total_result_bb", "bb_per_100"
+)
+
+
 def export_sessions_to_csv(sessions, filename):
+    # itemgetter достаёт все колонки сессии одним вызовом,
+    # а writerows пишет строки пачкой
+    row = operator.itemgetter(*_CSV_COLUMNS)
     with open(filename, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow([
-            "session_id", "start_time", "end_time", "duration_minutes",
-            "hands_count", "limit", "total_result_money",
-            "total_result_bb", "bb_per_100"
-        ])
-
-        for s in sessions:
-            writer.writerow([
-                s["session_id"],
-                s["start_time"],
-                s["end_time"],
-                s["duration_minutes"],
-                s["hands_count"],
-                s["limit"],
-                s["total_result_money"],
-                s["total_result_bb"],
-                s["bb_per_100"],
-            ])
-
-
-def export_full_to_json(summary, sessions, limits, filename):
+        writer.writerow(_CSV_COLUMNS)
+        writer.writerows(map(row, sessions))
+
+
+def export_full_to_json(summary, sessions, limits, filename, pretty: bool = False):
     data = {
         "summary": summary,
         "sessions": sessions,
         "limits": limits,
     }
+    # default=str — datetime сам по себе в JSON не сериализуется.
+    # По умолчанию пишем компактно: indent заметно замедляет запись и раздувает файл.
+    if pretty:
+        dump_kwargs = {"indent": 4}
+    else:
+        dump_kwargs = {"separators": (",", ":")}
     with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+        json.dump(data, f, ensure_ascii=False, default=str, **dump_kwargs)
 
 
 # =========================
@@ -424,40 +724,28 @@ def main():
         print(f"Ошибка: путь {base_path} не существует.", file=sys.stderr)
         sys.exit(1)
 
-    # Читаем файлы
-    all_raw_hands = []
-    for file in iter_hand_files(base_path, args.recursive, args.all_files):
-        try:
-            text = file.read_text(encoding=args.encoding)
-        except Exception as e:
-            print(f"Ошибка чтения файла {file}: {e}", file=sys.stderr)
-            continue
+    # Читаем и парсим файлы потоково, без промежуточного списка всех раздач
+    files = iter_hand_files(base_path, args.recursive, args.all_files)
+    if args.threads and _regex is None:
+        print("Модуль regex не установлен — --threads игнорируется, парсим процессами.",
+              file=sys.stderr)
 
-        blocks = split_raw_hands(text)
-        all_raw_hands.extend(blocks)
+    stats = {}
+    hands = iter_parsed_hands(
+        files, args.hero_name, args.encoding, args.workers, stats, args.threads
+    )
+
+    # Сессии, статистика лимитов и сводка — за один проход
+    sessions, limits, summary = build_all(
+        hands, args.session_gap_minutes, keep_hands=args.export_hands
+    )
 
-    if not all_raw_hands:
+    # Как и раньше, выходим, только если в файлах не нашлось ни одного
+    # блока раздачи; нераспарсенные раздачи дают пустые отчёты
+    if not stats["raw_hands"]:
         print("Раздачи не найдены.")
         sys.exit(0)
 
-    # Парсим раздачи
-    hands = []
-    for raw in all_raw_hands:
-        try:
-            h = parse_hand(raw, args.hero_name)
-            hands.append(h)
-        except Exception as e:
-            print(f"Ошибка парсинга раздачи: {e}", file=sys.stderr)
-
-    # Формируем сессии
-    sessions = build_sessions(hands, args.session_gap_minutes)
-
-    # Статистика лимитов
-    limits = build_limits_stats(sessions)
-
-    # Сводка
-    summary = build_summary(hands, sessions)
-
     # Вывод отчётов
     if "summary" in args.report:
         print_summary(summary)
@@ -475,7 +763,7 @@ def main():
 
     # Экспорт JSON
     if args.export_json:
-        export_full_to_json(summary, sessions, limits, args.export_json)
+        export_full_to_json(summary, sessions, limits, args.export_json, args.pretty)
         print(f"JSON экспортирован в {args.export_json}")
 
 